@@ -4,9 +4,11 @@ Handles both local SQLite and cloud database connections.
 """
 
 import os
-from sqlalchemy import create_engine
+from functools import lru_cache
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 
 from .settings import DATABASE_URL
 
@@ -25,23 +27,61 @@ def get_database_url():
         # Local development
         return DATABASE_URL
 
-# Create engine with cloud-appropriate settings
-database_url = get_database_url()
+# Compiled-statement cache entries per engine (SQLAlchemy's default is 500)
+QUERY_CACHE_SIZE = 1200
+
+
+def _set_sqlite_pragma(dbapi_connection, connection_record):
+    """
+    Per-connection SQLite tuning: WAL lets readers run alongside a writer, and
+    synchronous=NORMAL drops the fsync on every commit (still safe under WAL).
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")
+    cursor.close()
+
+
+@lru_cache(maxsize=1)
+def get_engine():
+    """Create the database engine once per process (one per warm container)."""
+    database_url = get_database_url()
+
+    if database_url.startswith("sqlite"):
+        # SQLite settings
+        sqlite_engine = create_engine(
+            database_url,
+            connect_args={"check_same_thread": False} if "memory" not in database_url else {},
+            query_cache_size=QUERY_CACHE_SIZE
+        )
+        event.listen(sqlite_engine, "connect", _set_sqlite_pragma)
+        return sqlite_engine
+
+    if os.getenv("PGBOUNCER"):
+        # An external pooler (PgBouncer) handles connection reuse
+        return create_engine(
+            database_url,
+            poolclass=NullPool,
+            query_cache_size=QUERY_CACHE_SIZE
+        )
 
-if database_url.startswith("sqlite"):
-    # SQLite settings
-    engine = create_engine(
-        database_url,
-        connect_args={"check_same_thread": False} if "memory" not in database_url else {}
-    )
-else:
     # PostgreSQL/other cloud database settings
-    engine = create_engine(
+    return create_engine(
         database_url,
+        pool_size=10,
+        max_overflow=5,
+        pool_timeout=10,
+        pool_recycle=1800,
         pool_pre_ping=True,
-        pool_recycle=300
+        query_cache_size=QUERY_CACHE_SIZE
     )
 
+
+# Create engine with cloud-appropriate settings
+engine = get_engine()
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -1,8 +1,13 @@
 """Database utilities and session management."""
 
+import threading
 from contextlib import contextmanager
+from datetime import date, datetime, time
+from functools import lru_cache
+from typing import Optional, Tuple
+from cachetools import TTLCache
 from sqlalchemy.orm import Session
-from .database import SessionLocal, engine, Base, init_db as init_database
+from .database import SessionLocal, engine, Base, get_db, init_db as init_database
 from . import models
 
 
@@ -25,11 +30,30 @@ def get_db_session():
         session.close()
 
 
-def get_db():
-    """Dependency for FastAPI to get database session."""
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+@lru_cache(maxsize=8)
+def day_bounds(day: date) -> Tuple[datetime, datetime]:
+    """First and last instant of a day, for due_at/updated_at range filters."""
+    return datetime.combine(day, time.min), datetime.combine(day, time.max)
+
+
+# Dashboard (pending, completed today) counts per user, reused for up to 30 seconds
+_counts_cache = TTLCache(maxsize=1024, ttl=30)
+_counts_lock = threading.Lock()
+
+
+def get_cached_counts(user_phone: str) -> Optional[Tuple[int, int]]:
+    """Get the user's cached dashboard counts, if still fresh."""
+    with _counts_lock:
+        return _counts_cache.get(user_phone)
+
+
+def set_cached_counts(user_phone: str, counts: Tuple[int, int]):
+    """Cache the user's dashboard counts."""
+    with _counts_lock:
+        _counts_cache[user_phone] = counts
+
 
+def invalidate_counts(user_phone: str):
+    """Drop the user's cached dashboard counts after their tasks change."""
+    with _counts_lock:
+        _counts_cache.pop(user_phone, None)
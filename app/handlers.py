@@ -1,31 +1,61 @@
 """WhatsApp webhook handlers and message processing."""
 
+import logging
 import re
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Optional
 from fastapi import APIRouter, Request, Depends, HTTPException
 from fastapi.responses import PlainTextResponse
-from twilio.rest import Client
+import httpx
 from twilio.request_validator import RequestValidator
+from sqlalchemy import Row, select, update
 from sqlalchemy.orm import Session
 
 from .settings import (
     TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_WHATSAPP_NUMBER,
-    ALLOWED_SENDERS, TZ
+    ALLOWED_SENDERS, APP_BASE_URL, TZ, normalize_phone
 )
 from .models import Reminder, ReminderStatus, ReminderSource
-from .db import get_db
-from .parsers import parse_text, ParsedReminder
+from .db import get_db, invalidate_counts
+from .parsers import parse_text, complete_parse, ParsedReminder
 from .whisper_utils import transcribe_if_voice
 # Removed circular import - will handle scheduling differently
 import pytz
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
-# Initialize Twilio client and validator
-twilio_client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-twilio_validator = RequestValidator(TWILIO_AUTH_TOKEN)
-timezone = pytz.UTC  # Force UTC for serverless
+# Initialize Twilio HTTP client and validator
+# Messages go straight to Twilio's REST API over a pooled async client so sends don't block the event loop
+twilio_http = httpx.AsyncClient(
+    auth=(TWILIO_ACCOUNT_SID or "", TWILIO_AUTH_TOKEN or ""),
+    base_url="https://api.twilio.com/2010-04-01",
+    timeout=5.0
+)
+# None without an auth token: there's nothing to check signatures against, so every webhook is rejected
+twilio_validator = RequestValidator(TWILIO_AUTH_TOKEN) if TWILIO_AUTH_TOKEN else None
+UTC = pytz.UTC
+timezone = UTC  # Force UTC for serverless
+
+_ID_RE = re.compile(r'#?(\d+)')
+_VERB_RE = re.compile(r'\b(done|cancel|delete|remove)\b', re.IGNORECASE)
+
+# Fixed replies, built once at import
+HELP_TEXT = (
+    "🤔 I didn't understand that. Try:\n\n"
+    "• *Remind me to [task] at [time]*\n"
+    "• *LIST* - see today's reminders\n"
+    "• *DONE #[number]* - mark complete"
+)
+EMPTY_MESSAGE_TEXT = "🤔 I didn't receive any text. Please send me a reminder!"
+NO_TIME_TEXT = "❌ Sorry, I couldn't understand when you want to be reminded. Please try again with a specific time."
+NOT_FOUND_TEXT = "❌ Reminder not found. Try *LIST* to see your reminders."
+LIST_ALL_TITLE = "📋 *All Pending Reminders*"
+LIST_TODAY_TITLE = "📋 *Today's Reminders*"
+LIST_ALL_EMPTY = f"{LIST_ALL_TITLE}\n\nNo reminders found! 🎉"
+LIST_TODAY_EMPTY = f"{LIST_TODAY_TITLE}\n\nNo reminders found! 🎉"
+LIST_FOOTER = "\n💬 Reply *DONE #number* to mark complete"
 
 
 class MessageHandler:
@@ -37,85 +67,87 @@ class MessageHandler:
     def handle_reminder(self, parsed: ParsedReminder, from_phone: str, source: ReminderSource) -> str:
         """Handle a new reminder message."""
         if not parsed.due_at:
-            return "❌ Sorry, I couldn't understand when you want to be reminded. Please try again with a specific time."
+            return NO_TIME_TEXT
         
         # Create new reminder
         reminder = Reminder(
             created_by=from_phone,
             for_user=from_phone,  # For now, assume reminders are for the sender
             text=parsed.text,
-            due_at=parsed.due_at.astimezone(pytz.UTC),
+            due_at=parsed.due_at.astimezone(UTC),
             status=ReminderStatus.PENDING,
             source=source
         )
         
         self.db.add(reminder)
+        # The flush's INSERT fills in the primary key (RETURNING/lastrowid); read it before
+        # commit expires the instance, so no follow-up SELECT is needed
+        self.db.flush()
+        reminder_id = reminder.id
         self.db.commit()
-        self.db.refresh(reminder)
+        invalidate_counts(from_phone)
         
         # Scheduling handled in scheduler module to avoid circular imports
         
         # Format response
         due_local = parsed.due_at.astimezone(timezone)
-        if due_local.date() == datetime.now(timezone).date():
+        due_date = due_local.date()
+        today = datetime.now(timezone).date()
+        if due_date == today:
             when_str = f"Today {due_local.strftime('%H:%M')}"
-        elif due_local.date() == (datetime.now(timezone).date().replace(day=datetime.now(timezone).day + 1)):
+        elif due_date == today + timedelta(days=1):
             when_str = f"Tomorrow {due_local.strftime('%H:%M')}"
         else:
             when_str = due_local.strftime('%a %d %b %H:%M')
         
-        return f"✅ *Added reminder #{reminder.id}*\n\n\"{parsed.text}\"\n\n📅 {when_str}"
+        return f"✅ *Added reminder #{reminder_id}*\n\n\"{parsed.text}\"\n\n📅 {when_str}"
     
     def handle_list(self, parsed: ParsedReminder, from_phone: str) -> str:
         """Handle list reminders request."""
         message_lower = parsed.text.lower()
+        # Only the columns rendered below - plain rows instead of full ORM objects
+        columns = (Reminder.id, Reminder.text, Reminder.due_at)
         
         if "all" in message_lower:
             # List all pending reminders
-            reminders = self.db.query(Reminder).filter(
+            reminders = self.db.query(*columns).filter(
                 Reminder.for_user == from_phone,
                 Reminder.status == ReminderStatus.PENDING
             ).order_by(Reminder.due_at).all()
-            title = "📋 *All Pending Reminders*"
+            title, empty_text = LIST_ALL_TITLE, LIST_ALL_EMPTY
         else:
             # List today's reminders
-            today_start = datetime.now(timezone).replace(hour=0, minute=0, second=0, microsecond=0)
-            today_end = today_start.replace(hour=23, minute=59, second=59)
+            now_local = datetime.now(timezone)
+            today_start = now_local.replace(hour=0, minute=0, second=0, microsecond=0)
+            today_end = now_local.replace(hour=23, minute=59, second=59, microsecond=0)
+            today_start_utc = today_start.astimezone(UTC)
+            today_end_utc = today_end.astimezone(UTC)
             
-            reminders = self.db.query(Reminder).filter(
+            reminders = self.db.query(*columns).filter(
                 Reminder.for_user == from_phone,
                 Reminder.status == ReminderStatus.PENDING,
-                Reminder.due_at >= today_start.astimezone(pytz.UTC),
-                Reminder.due_at <= today_end.astimezone(pytz.UTC)
+                Reminder.due_at >= today_start_utc,
+                Reminder.due_at <= today_end_utc
             ).order_by(Reminder.due_at).all()
-            title = "📋 *Today's Reminders*"
+            title, empty_text = LIST_TODAY_TITLE, LIST_TODAY_EMPTY
         
         if not reminders:
-            return f"{title}\n\nNo reminders found! 🎉"
-        
-        message = f"{title}\n\n"
-        for reminder in reminders:
-            due_local = reminder.due_at.astimezone(timezone)
-            time_str = due_local.strftime('%H:%M')
-            message += f"#{reminder.id} {reminder.text} - {time_str}\n"
+            return empty_text
         
-        message += f"\n💬 Reply *DONE #number* to mark complete"
-        return message
+        parts = [title, ""]
+        parts.extend(
+            f"#{reminder_id} {text} - {due_at.astimezone(timezone).strftime('%H:%M')}"
+            for reminder_id, text, due_at in reminders
+        )
+        parts.append(LIST_FOOTER)
+        return "\n".join(parts)
     
     def handle_done(self, parsed: ParsedReminder, from_phone: str) -> str:
         """Handle marking reminder as done."""
-        reminder = self._find_reminder(parsed.text, from_phone)
+        reminder = self._update_status(parsed.text, from_phone, ReminderStatus.DONE)
         
         if not reminder:
-            return "❌ Reminder not found. Try *LIST* to see your reminders."
-        
-        if reminder.status != ReminderStatus.PENDING:
-            return f"ℹ️ Reminder #{reminder.id} is already marked as {reminder.status.lower()}."
-        
-        # Mark as done
-        reminder.status = ReminderStatus.DONE
-        reminder.updated_at = datetime.utcnow()
-        self.db.commit()
+            return NOT_FOUND_TEXT
         
         # Scheduler will handle cleanup automatically
         
@@ -123,45 +155,57 @@ class MessageHandler:
     
     def handle_cancel(self, parsed: ParsedReminder, from_phone: str) -> str:
         """Handle cancelling a reminder."""
-        reminder = self._find_reminder(parsed.text, from_phone)
+        reminder = self._update_status(parsed.text, from_phone, ReminderStatus.CANCELLED)
         
         if not reminder:
-            return "❌ Reminder not found. Try *LIST* to see your reminders."
-        
-        if reminder.status != ReminderStatus.PENDING:
-            return f"ℹ️ Reminder #{reminder.id} is already {reminder.status.lower()}."
-        
-        # Mark as cancelled
-        reminder.status = ReminderStatus.CANCELLED
-        reminder.updated_at = datetime.utcnow()
-        self.db.commit()
+            return NOT_FOUND_TEXT
         
         # Scheduler will handle cleanup automatically
         
         return f"❌ *Cancelled reminder #{reminder.id}*\n\n\"{reminder.text}\""
     
-    def _find_reminder(self, text: str, from_phone: str) -> Optional[Reminder]:
-        """Find a reminder by ID or text content."""
+    def _update_status(self, text: str, from_phone: str, new_status: ReminderStatus) -> Optional[Row]:
+        """
+        Move a pending reminder, found by ID or text content, to a new status.
+        Uses a single UPDATE ... RETURNING and returns the (id, text) row, or None if nothing matched.
+        """
         # Try to extract ID from text like "DONE 123" or "DONE #123"
-        id_match = re.search(r'#?(\d+)', text)
+        id_match = _ID_RE.search(text)
         if id_match:
-            reminder_id = int(id_match.group(1))
-            return self.db.query(Reminder).filter(
-                Reminder.id == reminder_id,
-                Reminder.for_user == from_phone,
-                Reminder.status == ReminderStatus.PENDING
-            ).first()
-        
-        # Try to find by partial text match
-        clean_text = re.sub(r'\b(done|cancel|delete|remove)\b', '', text, flags=re.IGNORECASE).strip()
-        if clean_text:
-            return self.db.query(Reminder).filter(
+            target = Reminder.id == int(id_match.group(1))
+        else:
+            # Try to find by partial text match
+            clean_text = _VERB_RE.sub('', text).strip()
+            if not clean_text:
+                return None
+            target = Reminder.id == select(Reminder.id).where(
                 Reminder.for_user == from_phone,
                 Reminder.status == ReminderStatus.PENDING,
                 Reminder.text.ilike(f'%{clean_text}%')
-            ).first()
+            ).limit(1).scalar_subquery()
         
-        return None
+        reminder = self.db.execute(
+            update(Reminder)
+            .where(target, Reminder.for_user == from_phone, Reminder.status == ReminderStatus.PENDING)
+            .values(status=new_status, updated_at=datetime.utcnow())
+            .returning(Reminder.id, Reminder.text)
+            .execution_options(synchronize_session=False)
+        ).first()
+        self.db.commit()
+        if reminder:
+            invalidate_counts(from_phone)
+        return reminder
+
+
+def _webhook_url(request: Request) -> str:
+    """
+    Rebuild the URL Twilio signed from APP_BASE_URL, since behind ngrok/Vercel
+    the scheme and host the app sees differ from the public ones.
+    """
+    url = f"{APP_BASE_URL.rstrip('/')}{request.url.path}"
+    if request.url.query:
+        url += f"?{request.url.query}"
+    return url
 
 
 @router.post("/twilio/whatsapp")
@@ -170,13 +214,20 @@ async def handle_whatsapp_webhook(request: Request, db: Session = Depends(get_db
     try:
         # Get form data
         form = await request.form()
+        
+        # Security: Reject anything not signed by Twilio before doing any work
+        signature = request.headers.get("X-Twilio-Signature", "")
+        if twilio_validator is None or not twilio_validator.validate(_webhook_url(request), dict(form), signature):
+            logger.warning("Rejected WhatsApp webhook with invalid Twilio signature")
+            return PlainTextResponse("forbidden", status_code=403)
+        
         from_phone = form.get("From", "")
         body = form.get("Body", "")
         media_count = int(form.get("NumMedia", "0"))
         
         # Security: Check if sender is allowed
-        if ALLOWED_SENDERS and from_phone not in ALLOWED_SENDERS:
-            print(f"Blocked message from unauthorized sender: {from_phone}")
+        if ALLOWED_SENDERS and normalize_phone(from_phone) not in ALLOWED_SENDERS:
+            logger.warning(f"Blocked message from unauthorized sender: {from_phone}")
             return PlainTextResponse("", status_code=200)  # Return 200 to avoid retries
         
         # Handle voice notes
@@ -188,12 +239,17 @@ async def handle_whatsapp_webhook(request: Request, db: Session = Depends(get_db
                 source = ReminderSource.VOICE
         
         if not body.strip():
-            send_whatsapp_message(from_phone, "🤔 I didn't receive any text. Please send me a reminder!")
+            await send_whatsapp_message(from_phone, EMPTY_MESSAGE_TEXT)
             return PlainTextResponse("OK")
         
         # Parse the message
         parsed = parse_text(body)
         
+        if parsed.command_type == "reminder" and not parsed.due_at:
+            # Resolve the time (GPT fallback, bounded by its timeout) before replying: on
+            # serverless, work left running after the response can be frozen or killed
+            parsed = await complete_parse(parsed)
+        
         # Handle different command types
         handler = MessageHandler(db)
         
@@ -206,30 +262,36 @@ async def handle_whatsapp_webhook(request: Request, db: Session = Depends(get_db
         elif parsed.command_type == "cancel":
             response = handler.handle_cancel(parsed, from_phone)
         else:
-            response = "🤔 I didn't understand that. Try:\n\n• *Remind me to [task] at [time]*\n• *LIST* - see today's reminders\n• *DONE #[number]* - mark complete"
+            response = HELP_TEXT
         
         # Send response
-        send_whatsapp_message(from_phone, response)
+        await send_whatsapp_message(from_phone, response)
         
         return PlainTextResponse("OK")
         
     except Exception as e:
-        print(f"Error handling WhatsApp message: {e}")
+        logger.exception(f"Error handling WhatsApp message: {e}")
         # Don't send error to user, just log it
         return PlainTextResponse("ERROR", status_code=500)
 
 
-def send_whatsapp_message(to_phone: str, message: str):
-    """Send a WhatsApp message via Twilio."""
+async def send_whatsapp_message(to_phone: str, message: str) -> bool:
+    """Send a WhatsApp message via Twilio. Returns True if Twilio accepted it."""
     try:
-        twilio_client.messages.create(
-            from_=TWILIO_WHATSAPP_NUMBER,
-            to=to_phone,
-            body=message
+        response = await twilio_http.post(
+            f"/Accounts/{TWILIO_ACCOUNT_SID}/Messages.json",
+            data={
+                "From": TWILIO_WHATSAPP_NUMBER,
+                "To": to_phone,
+                "Body": message
+            }
         )
-        print(f"Sent message to {to_phone}: {message[:50]}...")
+        response.raise_for_status()
+        logger.info(f"Sent message to {to_phone}: {message[:50]}...")
+        return True
     except Exception as e:
-        print(f"Error sending WhatsApp message to {to_phone}: {e}")
+        logger.error(f"Error sending WhatsApp message to {to_phone}: {e}")
+        return False
 
 
 @router.get("/health")
@@ -5,51 +5,90 @@ A minimal WhatsApp-first reminder bot that helps manage daily tasks
 through natural language voice notes and text messages.
 """
 
-import uvicorn
+import logging
+import queue
 from contextlib import asynccontextmanager
+from logging.handlers import QueueHandler, QueueListener
+
+import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from .settings import validate_settings
+from .settings import validate_settings, TZ, DAILY_DIGEST_HOUR, ALLOWED_SENDERS
 from .db import init_db
 # Scheduler disabled for serverless deployment
 # from .scheduler import start_scheduler, stop_scheduler
-from .handlers import router as twilio_router
+from .handlers import router as twilio_router, twilio_http
+from .whisper_utils import media_http
 from .web import router as web_router
 
 
+def start_log_listener() -> QueueListener:
+    """
+    Route all log records through an in-memory queue drained by a background thread,
+    so request handlers never block on writing to stdout.
+    """
+    root = logging.getLogger()
+    handlers = root.handlers or [logging.StreamHandler()]
+    for handler in handlers:
+        if handler.formatter is None:
+            handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+    
+    log_queue = queue.Queue(-1)
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    root.handlers = [QueueHandler(log_queue)]
+    root.setLevel(logging.INFO)
+    listener.start()
+    return listener
+
+
+def stop_log_listener(listener: QueueListener):
+    """Flush queued log records and hand the original handlers back to the root logger."""
+    listener.stop()
+    logging.getLogger().handlers = list(listener.handlers)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager."""
     # Startup
-    print("🚀 Starting Nudgly...")
-    
-    # Validate configuration
-    try:
-        validate_settings()
-        print("✅ Settings validated")
-    except ValueError as e:
-        print(f"❌ Configuration error: {e}")
-        raise
-    
-    # Initialize database
+    log_listener = start_log_listener()
     try:
-        init_db()
-        print("✅ Database initialized")
-    except Exception as e:
-        print(f"❌ Database initialization failed: {e}")
-        raise
-    
-    # Scheduler disabled for serverless deployment
-    print("⚠️ Scheduler disabled (serverless mode)")
-    
-    print("🎉 Nudgly is ready!")
-    
-    yield
-    
-    # Shutdown
-    print("🛑 Shutting down Nudgly...")
-    print("✅ Serverless shutdown complete")
+        print("🚀 Starting Nudgly...")
+        
+        # Validate configuration
+        try:
+            validate_settings()
+            print("✅ Settings validated")
+        except ValueError as e:
+            print(f"❌ Configuration error: {e}")
+            raise
+        
+        # Initialize database
+        try:
+            init_db()
+            print("✅ Database initialized")
+        except Exception as e:
+            print(f"❌ Database initialization failed: {e}")
+            raise
+        
+        # Scheduler disabled for serverless deployment - when enabled, start_scheduler()
+        # belongs here so it binds to the running event loop
+        print("⚠️ Scheduler disabled (serverless mode)")
+        
+        print("🎉 Nudgly is ready!")
+        
+        yield
+        
+        # Shutdown
+        print("🛑 Shutting down Nudgly...")
+        await twilio_http.aclose()
+        await media_http.aclose()
+        print("✅ Serverless shutdown complete")
+    finally:
+        # Also on a failed startup, so queued records are flushed and the root
+        # logger gets its handlers back
+        stop_log_listener(log_listener)
 
 
 # Create FastAPI application
@@ -80,8 +119,6 @@ app.include_router(twilio_router, tags=["WhatsApp"])
 @app.get("/status")
 async def status():
     """Application status endpoint."""
-    from .settings import TZ, DAILY_DIGEST_HOUR, ALLOWED_SENDERS
-    
     return {
         "status": "running",
         "timezone": TZ,
@@ -2,14 +2,11 @@
 
 from datetime import datetime
 from enum import Enum
-from sqlalchemy import Column, Integer, String, DateTime, Text, create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import Column, Integer, String, DateTime, Text, Index, DDL, event
+from sqlalchemy import Enum as SAEnum
 from sqlalchemy.sql import func
 
-from .settings import DATABASE_URL
-
-Base = declarative_base()
+from .database import Base
 
 
 class ReminderStatus(str, Enum):
@@ -23,20 +20,46 @@ class ReminderSource(str, Enum):
     """Source of how the reminder was created."""
     TEXT = "text"
     VOICE = "voice"
+    WEB = "web"
+
+
+def _enum_values(enum_cls):
+    """Persist enum values (e.g. "text") rather than member names (e.g. "TEXT")."""
+    return [member.value for member in enum_cls]
 
 
 class Reminder(Base):
     """Reminder model for storing user reminders."""
     __tablename__ = "reminders"
+    __table_args__ = (
+        # Serves the per-user list queries (filter + ORDER BY due_at) in one index seek;
+        # its for_user prefix also covers plain lookups by user.
+        Index("ix_reminders_user_status_due", "for_user", "status", "due_at"),
+        # Serves the dashboard's "completed today" count (status DONE, updated_at >= today)
+        Index("ix_reminders_user_status_updated", "for_user", "status", "updated_at"),
+        # Lets Postgres answer the ILIKE '%text%' lookups in DONE/CANCEL without a table scan
+        Index(
+            "ix_reminders_text_trgm", "text",
+            postgresql_using="gin",
+            postgresql_ops={"text": "gin_trgm_ops"}
+        ).ddl_if(dialect="postgresql"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     created_by = Column(String(50), nullable=False, index=True)  # E.164 format: whatsapp:+447...
-    for_user = Column(String(50), nullable=False, index=True)    # Usually Natasha's number
+    for_user = Column(String(50), nullable=False)                # Usually Natasha's number
     text = Column(Text, nullable=False)                          # The reminder text
     due_at = Column(DateTime, nullable=False, index=True)        # When reminder is due (UTC)
     recurrence = Column(String(50), nullable=True)              # e.g., DAILY, WEEKLY:MO
-    status = Column(String(20), nullable=False, default=ReminderStatus.PENDING)
-    source = Column(String(10), nullable=False, default=ReminderSource.TEXT)
+    # Native ENUM types on Postgres (4 bytes per value); VARCHAR elsewhere
+    status = Column(
+        SAEnum(ReminderStatus, name="reminder_status", values_callable=_enum_values),
+        nullable=False, default=ReminderStatus.PENDING
+    )
+    source = Column(
+        SAEnum(ReminderSource, name="reminder_source", values_callable=_enum_values),
+        nullable=False, default=ReminderSource.TEXT
+    )
     created_at = Column(DateTime, nullable=False, default=func.now())
     updated_at = Column(DateTime, nullable=False, default=func.now(), onupdate=func.now())
 
@@ -44,6 +67,14 @@ class Reminder(Base):
         return f"<Reminder(id={self.id}, text='{self.text[:30]}...', due_at={self.due_at})>"
 
 
+# The trigram index above needs the pg_trgm extension to exist first
+event.listen(
+    Reminder.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql")
+)
+
+
 class Contact(Base):
     """Contact model for managing trusted users."""
     __tablename__ = "contacts"
@@ -56,23 +87,3 @@ class Contact(Base):
 
     def __repr__(self):
         return f"<Contact(phone='{self.phone}', name='{self.name}', role='{self.role}')>"
-
-
-# Database engine and session setup
-engine = create_engine(DATABASE_URL, echo=False)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-
-def create_tables():
-    """Create all database tables."""
-    Base.metadata.create_all(bind=engine)
-
-
-def get_db():
-    """Get database session."""
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
@@ -1,19 +1,95 @@
 """Text parsing functionality for natural language reminders."""
 
+import asyncio
+import json
+import logging
 import re
-from dataclasses import dataclass
-from datetime import datetime, timedelta
+import time
+from dataclasses import dataclass, replace
+from datetime import date, datetime, time as dt_time, timedelta
+from functools import lru_cache
 from typing import Optional, Tuple
-import dateparser
 import pytz
-from openai import OpenAI
 
 from .settings import OPENAI_API_KEY, TZ, REMINDER_KEYWORDS, LIST_KEYWORDS, DONE_KEYWORDS, CANCEL_KEYWORDS
 
+logger = logging.getLogger(__name__)
 
-@dataclass
+
+# Command keywords in precedence order: a message matching several is treated as the first
+_INTENT_KEYWORDS = (("list", LIST_KEYWORDS), ("done", DONE_KEYWORDS), ("cancel", CANCEL_KEYWORDS))
+
+# All command keywords compiled once into a single alternation with a named group per
+# intent, so a message is scanned in one pass instead of once per keyword list
+_INTENT_RE = re.compile(
+    '|'.join(
+        rf"(?P<{intent}>\b(?:{'|'.join(map(re.escape, keywords))})\b)"
+        for intent, keywords in _INTENT_KEYWORDS
+    ),
+    re.IGNORECASE
+)
+_INTENT_PRIORITY = [intent for intent, _ in _INTENT_KEYWORDS]
+
+_REMINDER_PREFIXES = tuple(REMINDER_KEYWORDS)
+
+# Most commands lead with their verb ("LIST", "DONE #3"), so look the first word up
+# directly; later entries win, keeping the list > done > cancel precedence
+_COMMAND_FIRST_WORDS = {
+    keyword: command
+    for command, keywords in reversed(_INTENT_KEYWORDS)
+    for keyword in keywords
+    if " " not in keyword
+}
+
+# Force UTC timezone for serverless to avoid issues
+_TZ = pytz.UTC
+
+# Upper bound on the GPT fallback so a slow OpenAI call can't stall a reply
+GPT_TIMEOUT_SECONDS = 2.0
+
+_DATEPARSER_SETTINGS = {
+    'PREFER_DATES_FROM': 'future',
+    'TIMEZONE': TZ,
+    'RETURN_AS_TIMEZONE_AWARE': True
+}
+
+# Time of day for reminders that name a day but no time ("on friday", "tonight")
+DEFAULT_REMINDER_HOUR = 9
+TONIGHT_HOUR = 20
+
+_WEEKDAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+_MONTHS = ('jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec')
+_MONTH_RE = (r'(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?'
+             r'|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)')
+_ORDINAL = r'(?:st|nd|rd|th)'
+
+# The date/time phrases reminders actually use, matched directly. dateparser's free-text
+# search misreads too many of them ("on the 1st", "call may at noon") to be trusted here.
+_RELATIVE_RE = re.compile(
+    r'\bin\s+(?P<amount>\d+|an?)\s+(?P<unit>minutes?|mins?|hours?|hrs?|days?|weeks?)\b',
+    re.IGNORECASE
+)
+_DAY_RE = re.compile(
+    r"\b(?:(?P<word>today|tonight|tomorrow)\b(?!')"
+    rf"|(?:on\s+)?(?:(?P<next>next)\s+)?(?P<weekday>{'|'.join(_WEEKDAYS)})\b"
+    r"|(?:on\s+)?(?P<numeric>\d{1,2}/\d{1,2}(?:/\d{2,4})?)\b"
+    rf"|(?:on\s+)?(?:the\s+)?(?P<dm_day>\d{{1,2}}){_ORDINAL}?\s+(?:of\s+)?(?P<dm_month>{_MONTH_RE})\b"
+    rf"|(?:on\s+)?(?P<md_month>{_MONTH_RE})\s+(?:the\s+)?(?P<md_day>\d{{1,2}}){_ORDINAL}?\b"
+    rf"|(?:on\s+)?(?:the\s+)?(?P<dom>\d{{1,2}}){_ORDINAL}\b)",
+    re.IGNORECASE
+)
+_CLOCK_RE = re.compile(
+    r'\b(?:at\s+)?(?:(?P<hour>\d{1,2})(?::(?P<minute>\d{2}))?\s*(?P<meridiem>am|pm)\b'
+    r'|(?P<h24>\d{1,2}):(?P<m24>\d{2})\b'
+    r'|(?P<named>noon|midday|midnight)\b)'
+    r'|\bat\s+(?P<bare>\d{1,2})\b(?![/:])',
+    re.IGNORECASE
+)
+
+
+@dataclass(frozen=True)
 class ParsedReminder:
-    """Parsed reminder data."""
+    """Parsed reminder data (immutable, as parse results are shared from the cache)."""
     text: str
     due_at: Optional[datetime] = None
     recurrence: Optional[str] = None
@@ -24,9 +100,16 @@ class MessageParser:
     """Parser for natural language reminder messages."""
     
     def __init__(self):
-        # Force UTC timezone for serverless to avoid issues
-        self.timezone = pytz.UTC
-        self.openai_client = OpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY else None
+        self.timezone = _TZ
+        self._openai_client = None
+    
+    @property
+    def openai_client(self):
+        """OpenAI client, created on first use to keep the SDK import off cold starts."""
+        if self._openai_client is None and OPENAI_API_KEY:
+            from openai import AsyncOpenAI
+            self._openai_client = AsyncOpenAI(api_key=OPENAI_API_KEY)
+        return self._openai_client
     
     def parse_message(self, message: str) -> ParsedReminder:
         """Parse a message and extract reminder information."""
@@ -45,43 +128,54 @@ class MessageParser:
     
     def _detect_command_type(self, message: str) -> str:
         """Detect the type of command from the message."""
-        message_lower = message.lower()
+        words = message.split(maxsplit=1)
+        if words:
+            command = _COMMAND_FIRST_WORDS.get(words[0].lower())
+            if command:
+                return command
         
-        if any(keyword in message_lower for keyword in LIST_KEYWORDS):
-            return "list"
-        elif any(keyword in message_lower for keyword in DONE_KEYWORDS):
-            return "done"
-        elif any(keyword in message_lower for keyword in CANCEL_KEYWORDS):
-            return "cancel"
-        
-        return "reminder"
+        return match_intent(message) or "reminder"
     
     def _parse_reminder(self, message: str) -> ParsedReminder:
-        """Parse a reminder message to extract task and timing."""
+        """
+        Parse a reminder message to extract task and timing.
+        Leaves due_at as None when no time can be found in the text - see complete_reminder.
+        """
         # Clean up common reminder prefixes
         clean_message = self._clean_reminder_prefix(message)
         
-        # Try to extract time/date information using dateparser
+        # Try to extract time/date information
         due_at, cleaned_text = self._extract_datetime(clean_message)
         
-        # If dateparser failed, try GPT as fallback
-        if not due_at and self.openai_client:
-            due_at, cleaned_text = self._gpt_parse_fallback(clean_message)
-        
-        # If still no date/time, default to current time + 1 hour
-        if not due_at:
-            due_at = datetime.now(self.timezone) + timedelta(hours=1)
-            cleaned_text = clean_message
-        
         return ParsedReminder(
             text=cleaned_text.strip(),
             due_at=due_at,
             command_type="reminder"
         )
     
+    async def complete_reminder(self, parsed: ParsedReminder) -> ParsedReminder:
+        """Fill in the due time of a reminder whose text had no recognisable time."""
+        if parsed.due_at:
+            return parsed
+        
+        due_at, cleaned_text = None, parsed.text
+        
+        # If the text had no time, try GPT as fallback
+        if self.openai_client:
+            due_at, cleaned_text = await self._gpt_parse_fallback(parsed.text)
+        
+        # If still no date/time, default to current time + 1 hour
+        if not due_at:
+            due_at = datetime.now(self.timezone) + timedelta(hours=1)
+            cleaned_text = parsed.text
+        
+        return replace(parsed, text=cleaned_text.strip(), due_at=due_at)
+    
     def _clean_reminder_prefix(self, message: str) -> str:
         """Remove common reminder prefixes."""
         message_lower = message.lower()
+        if not message_lower.startswith(_REMINDER_PREFIXES):
+            return message
         
         for keyword in REMINDER_KEYWORDS:
             if message_lower.startswith(keyword):
@@ -95,63 +189,152 @@ class MessageParser:
         
         return message
     
-    def _extract_datetime(self, text: str) -> Tuple[Optional[datetime], str]:
-        """Extract datetime from text using dateparser."""
-        # Common time patterns to try
-        patterns = [
-            r'\b(?:at\s+)?(\d{1,2}(?::\d{2})?(?:\s*(?:am|pm))?)\b',
-            r'\b(tomorrow|today|tonight)\b',
-            r'\b(in\s+\d+\s+(?:minutes?|hours?|days?))\b',
-            r'\b(\d{1,2}/\d{1,2}(?:/\d{2,4})?)\b',
-        ]
-        
-        # Try to parse the entire text first
-        parsed_date = dateparser.parse(
-            text, 
-            settings={
-                'PREFER_DATES_FROM': 'future',
-                'TIMEZONE': TZ,
-                'RETURN_AS_TIMEZONE_AWARE': True
-            }
-        )
+    def _extract_datetime(self, text: str, now: Optional[datetime] = None) -> Tuple[Optional[datetime], str]:
+        """
+        Extract the due time from text, returning it with the text that's left once the
+        phrases that produced it are removed. Returns (None, text) if there's no time.
+        """
+        now = now or datetime.now(self.timezone)
+        used = []
         
-        if parsed_date:
-            # Try to find what part was the date/time and remove it
-            words = text.split()
-            cleaned_words = []
-            
-            for word in words:
-                word_date = dateparser.parse(word, settings={'TIMEZONE': TZ})
-                if not word_date:
-                    cleaned_words.append(word)
-            
-            cleaned_text = ' '.join(cleaned_words)
-            return parsed_date, cleaned_text
-        
-        # If full text parsing failed, try to find time patterns
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                time_part = match.group(1)
-                parsed_date = dateparser.parse(
-                    time_part,
-                    settings={
-                        'PREFER_DATES_FROM': 'future',
-                        'TIMEZONE': TZ,
-                        'RETURN_AS_TIMEZONE_AWARE': True
-                    }
-                )
-                if parsed_date:
-                    # Remove the matched time part from text
-                    cleaned_text = text.replace(match.group(0), '').strip()
-                    return parsed_date, cleaned_text
+        relative = _RELATIVE_RE.search(text)
+        day_match = _DAY_RE.search(text)
+        clock_match = _CLOCK_RE.search(text)
+        clock = self._resolve_clock(clock_match)
         
-        return None, text
+        if relative:
+            amount = relative.group('amount')
+            amount = 1 if amount.lower() in ('a', 'an') else int(amount)
+            unit = relative.group('unit').lower()
+            used.append(relative)
+            if unit.startswith(('min', 'h')):
+                # "in 5 minutes"/"in 2 hours" are exact - any other time words don't apply
+                delta = timedelta(minutes=amount) if unit.startswith('min') else timedelta(hours=amount)
+                return now + delta, self._remove_spans(text, used)
+            day = (now + timedelta(days=amount * (7 if unit.startswith('week') else 1))).date()
+            day_match = None
+        else:
+            day = self._resolve_day(day_match, now) if day_match else None
+            if day_match and day is None:
+                day_match = None  # Not a real date (e.g. "the 31st" of a short month)
+        
+        if day is None and clock is None and not relative:
+            return None, text
+        
+        word = day_match.group('word').lower() if day_match and day_match.group('word') else None
+        if clock is not None:
+            hour, minute = clock
+            if word == 'tonight' and clock_match.group('bare') and hour < 12:
+                hour += 12
+            used.append(clock_match)
+        elif word == 'tonight':
+            hour, minute = TONIGHT_HOUR, 0
+        elif relative or word in ('today', 'tomorrow'):
+            hour, minute = now.hour, now.minute
+        else:
+            hour, minute = DEFAULT_REMINDER_HOUR, 0
+        
+        if day_match:
+            used.append(day_match)
+        
+        if day is None:
+            # A bare time means its next occurrence
+            day = now.date()
+            if self._at(day, hour, minute) <= now:
+                day += timedelta(days=1)
+        elif day_match and (day_match.group('weekday') or day_match.group('dom')):
+            # A named weekday or day of the month that has already passed means the next one
+            due_at = self._at(day, hour, minute)
+            if due_at <= now:
+                day = (day + timedelta(days=7) if day_match.group('weekday')
+                       else self._next_day_of_month(day + timedelta(days=1), day.day))
+        
+        return self._at(day, hour, minute), self._remove_spans(text, used)
+    
+    def _at(self, day: date, hour: int, minute: int) -> datetime:
+        """The given day and time of day in the parser's timezone."""
+        return self.timezone.localize(datetime.combine(day, dt_time(hour, minute)))
+    
+    @staticmethod
+    def _resolve_clock(match: Optional[re.Match]) -> Optional[Tuple[int, int]]:
+        """Turn a matched time of day into (hour, minute), or None if it isn't a valid time."""
+        if not match:
+            return None
+        if match.group('named'):
+            return (0, 0) if match.group('named').lower() == 'midnight' else (12, 0)
+        if match.group('meridiem'):
+            hour, minute = int(match.group('hour')), int(match.group('minute') or 0)
+            if not 1 <= hour <= 12:
+                return None
+            hour = hour % 12 + (12 if match.group('meridiem').lower() == 'pm' else 0)
+        elif match.group('h24'):
+            hour, minute = int(match.group('h24')), int(match.group('m24'))
+        else:
+            hour, minute = int(match.group('bare')), 0
+        if hour > 23 or minute > 59:
+            return None
+        return hour, minute
     
-    def _gpt_parse_fallback(self, text: str) -> Tuple[Optional[datetime], str]:
+    @classmethod
+    def _resolve_day(cls, match: re.Match, now: datetime) -> Optional[date]:
+        """Turn a matched day expression into a date on or after today, or None if invalid."""
+        today = now.date()
+        if match.group('word'):
+            word = match.group('word').lower()
+            return today + timedelta(days=1) if word == 'tomorrow' else today
+        
+        if match.group('weekday'):
+            days_ahead = (_WEEKDAYS.index(match.group('weekday').lower()) - today.weekday()) % 7
+            if match.group('next') and days_ahead == 0:
+                days_ahead = 7
+            return today + timedelta(days=days_ahead)
+        
+        if match.group('dom'):
+            return cls._next_day_of_month(today, int(match.group('dom')))
+        
+        if match.group('numeric'):
+            # Imported lazily: dateparser compiles its locale data on import
+            import dateparser
+            parsed = dateparser.parse(match.group('numeric'), languages=['en'], settings=_DATEPARSER_SETTINGS)
+            return parsed.date() if parsed else None
+        
+        month_name = match.group('dm_month') or match.group('md_month')
+        day_of_month = int(match.group('dm_day') or match.group('md_day'))
+        month = _MONTHS.index(month_name[:3].lower()) + 1
+        for year in (today.year, today.year + 1):
+            try:
+                candidate = date(year, month, day_of_month)
+            except ValueError:
+                return None
+            if candidate >= today:
+                return candidate
+        return None
+    
+    @staticmethod
+    def _next_day_of_month(start: date, day_of_month: int) -> Optional[date]:
+        """The first date on or after start falling on day_of_month (skipping short months)."""
+        year, month = start.year, start.month
+        for _ in range(13):
+            try:
+                candidate = date(year, month, day_of_month)
+            except ValueError:
+                candidate = None
+            if candidate and candidate >= start:
+                return candidate
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return None
+    
+    @staticmethod
+    def _remove_spans(text: str, matches: list) -> str:
+        """Cut the matched phrases out of text and tidy the whitespace."""
+        for match in sorted(matches, key=lambda m: m.start(), reverse=True):
+            text = text[:match.start()] + ' ' + text[match.end():]
+        return ' '.join(text.split())
+    
+    async def _gpt_parse_fallback(self, text: str) -> Tuple[Optional[datetime], str]:
         """Use GPT to parse ambiguous date/time expressions."""
         try:
-            response = self.openai_client.chat.completions.create(
+            request = self.openai_client.chat.completions.create(
                 model="gpt-3.5-turbo",
                 messages=[
                     {
@@ -175,8 +358,8 @@ class MessageParser:
                 temperature=0.1,
                 max_tokens=150
             )
+            response = await asyncio.wait_for(request, timeout=GPT_TIMEOUT_SECONDS)
             
-            import json
             result = json.loads(response.choices[0].message.content)
             
             task = result.get("task", text)
@@ -189,16 +372,41 @@ class MessageParser:
                 return when_dt, task
             
         except Exception as e:
-            print(f"GPT parsing failed: {e}")
+            logger.warning(f"GPT parsing failed: {e!r}")
         
         return None, text
 
 
-# Global parser instance
-parser = MessageParser()
+def match_intent(text: str) -> Optional[str]:
+    """Return the command ("list", "done" or "cancel") a message's keywords point to, if any."""
+    found = {match.lastgroup for match in _INTENT_RE.finditer(text)}
+    if not found:
+        return None
+    return min(found, key=_INTENT_PRIORITY.index)
+
+
+@lru_cache(maxsize=1)
+def _parser() -> MessageParser:
+    """Shared parser instance, built on first use rather than at import."""
+    return MessageParser()
+
+
+@lru_cache(maxsize=2048)
+def _parse_cached(message: str, minute_bucket: int) -> ParsedReminder:
+    """Parse a message; the minute bucket keeps relative times like "in 5 minutes" fresh."""
+    return _parser().parse_message(message)
 
 
 def parse_text(message: str) -> ParsedReminder:
-    """Parse a text message into a structured reminder."""
-    return parser.parse_message(message)
+    """
+    Parse a text message into a structured reminder.
+    Reminders without a recognisable time come back with due_at=None;
+    pass them through complete_parse before saving.
+    """
+    return _parse_cached(message, int(time.time() // 60))
+
+
+async def complete_parse(parsed: ParsedReminder) -> ParsedReminder:
+    """Resolve a missing due time via the GPT fallback, defaulting to an hour from now."""
+    return await _parser().complete_reminder(parsed)
 
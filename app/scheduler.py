@@ -2,55 +2,93 @@
 Scheduler module for Nudgly - handles reminder notifications and daily digest.
 """
 
+import asyncio
 import logging
-from datetime import datetime, timedelta
-from apscheduler.schedulers.background import BackgroundScheduler
+from datetime import date, datetime, timedelta
+from itertools import groupby
+from operator import attrgetter
+from typing import List, Optional
+from apscheduler.executors.asyncio import AsyncIOExecutor
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.date import DateTrigger
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import and_
+import pytz
+from sqlalchemy import bindparam, select
 
-from .db import engine
+from .db import SessionLocal, day_bounds
+from .handlers import send_whatsapp_message
 from .models import Reminder
-from .settings import DAILY_DIGEST_HOUR, TZ, TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_WHATSAPP_NUMBER
-# Import moved to function to avoid circular import
+from .settings import DAILY_DIGEST_HOUR, TZ
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Global scheduler instance
 scheduler = None
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-def send_reminder_notification(reminder_id: int):
-    """Send a reminder notification via WhatsApp."""
+# Concurrent Twilio sends during the daily digest fan-out, to stay within Twilio's rate
+# limits and the shared HTTP client's connection pool
+DIGEST_WORKERS = 20
+
+# Scheduler queries, built once with bound parameters so each run only binds values
+_DIGEST_QUERY = select(Reminder).where(
+    Reminder.status == "PENDING",
+    Reminder.due_at >= bindparam("start"),
+    Reminder.due_at <= bindparam("end")
+).order_by(Reminder.for_user, Reminder.due_at)  # Each user's rows contiguous for grouping
+
+_UPCOMING_QUERY = select(Reminder.id, Reminder.due_at).where(
+    Reminder.status == "PENDING",
+    Reminder.due_at.isnot(None),
+    Reminder.due_at > bindparam("now")
+).execution_options(yield_per=500)
+
+# Message formats
+TIME_FORMAT = '%H:%M'
+DIGEST_DATE_FORMAT = '%A, %B %d'
+
+_STRIP_PLUS = str.maketrans('', '', '+')
+
+
+def clean_phone(phone: str) -> str:
+    """Bare digits of a WhatsApp address, e.g. "whatsapp:+447..." -> "447..."."""
+    return phone.replace('whatsapp:', '').translate(_STRIP_PLUS)
+
+
+def _load_reminder(reminder_id: int) -> Optional[Reminder]:
+    """Load a single reminder (blocking - run off the event loop)."""
     db = SessionLocal()
     try:
-        reminder = db.query(Reminder).filter(Reminder.id == reminder_id).first()
+        return db.query(Reminder).filter(Reminder.id == reminder_id).first()
+    finally:
+        db.close()
+
+
+def _load_digest_reminders(start: datetime, end: datetime) -> List[Reminder]:
+    """
+    Load all pending reminders due between start and end (blocking - run off the event loop).
+    Ordered so each user's rows are contiguous.
+    """
+    db = SessionLocal()
+    try:
+        return db.scalars(_DIGEST_QUERY, {"start": start, "end": end}).all()
+    finally:
+        db.close()
+
+
+async def send_reminder_notification(reminder_id: int):
+    """Send a reminder notification via WhatsApp."""
+    try:
+        reminder = await asyncio.to_thread(_load_reminder, reminder_id)
         if not reminder or reminder.status != "PENDING":
             logger.info(f"Reminder {reminder_id} not found or not pending, skipping")
             return
         
         message = f"🔔 Reminder: {reminder.text}"
         if reminder.due_at:
-            message += f"\n⏰ Due: {reminder.due_at.strftime('%H:%M')}"
+            message += f"\n⏰ Due: {reminder.due_at.strftime(TIME_FORMAT)}"
         
-        # Send WhatsApp message - import locally to avoid circular import
-        try:
-            from twilio.rest import Client
-            from .settings import TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_WHATSAPP_NUMBER
-            
-            client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-            client.messages.create(
-                from_=TWILIO_WHATSAPP_NUMBER,
-                to=reminder.for_user,
-                body=message
-            )
-            success = True
-        except Exception as e:
-            logger.error(f"Error sending WhatsApp message: {e}")
-            success = False
+        # Send WhatsApp message
+        success = await send_whatsapp_message(reminder.for_user, message)
         
         if success:
             logger.info(f"Reminder notification sent for reminder {reminder_id}")
@@ -59,110 +97,104 @@ def send_reminder_notification(reminder_id: int):
             
     except Exception as e:
         logger.error(f"Error sending reminder notification {reminder_id}: {e}")
-    finally:
-        db.close()
 
-def send_daily_digest():
-    """Send daily digest to all users with pending reminders."""
-    db = SessionLocal()
+async def _send_one_digest(user_phone: str, reminders: list, today: date, slots: asyncio.Semaphore):
+    """Build and send one user's daily digest."""
     try:
-        # Get all users with pending reminders for today
-        today = datetime.now().date()
-        today_start = datetime.combine(today, datetime.min.time())
-        today_end = datetime.combine(today, datetime.max.time())
+        display_phone = clean_phone(user_phone)
         
-        # Group reminders by user
-        from sqlalchemy import func
-        users_with_reminders = db.query(Reminder.for_user).filter(
-            and_(
-                Reminder.status == "PENDING",
-                Reminder.due_at >= today_start,
-                Reminder.due_at <= today_end
-            )
-        ).distinct().all()
+        # Build digest message
+        parts = [f"🗓 Daily Digest - {today.strftime(DIGEST_DATE_FORMAT)}", ""]
+        parts.extend(
+            f"{i}. {reminder.text} - {reminder.due_at.strftime(TIME_FORMAT) if reminder.due_at else 'No time'}"
+            for i, reminder in enumerate(reminders, 1)
+        )
+        parts.append("")
+        parts.append("📱 Reply with DONE [number] to mark complete")
+        parts.append(f"💻 View all tasks: {display_phone}")
+        message = "\n".join(parts)
+        
+        # Send digest
+        async with slots:
+            success = await send_whatsapp_message(user_phone, message)
         
-        for (user_phone,) in users_with_reminders:
-            # Get today's reminders for this user
-            reminders = db.query(Reminder).filter(
-                and_(
-                    Reminder.for_user == user_phone,
-                    Reminder.status == "PENDING",
-                    Reminder.due_at >= today_start,
-                    Reminder.due_at <= today_end
-                )
-            ).order_by(Reminder.due_at).all()
+        if success:
+            logger.info(f"Daily digest sent to {user_phone}")
+        else:
+            logger.error(f"Failed to send daily digest to {user_phone}")
             
-            if reminders:
-                # Build digest message
-                date_str = today.strftime('%A, %B %d')
-                message = f"🗓 Daily Digest - {date_str}\n\n"
-                
-                for i, reminder in enumerate(reminders, 1):
-                    time_str = reminder.due_at.strftime('%H:%M') if reminder.due_at else 'No time'
-                    message += f"{i}. {reminder.text} - {time_str}\n"
-                
-                message += f"\n📱 Reply with DONE [number] to mark complete"
-                message += f"\n💻 View all tasks: {reminder.for_user.replace('whatsapp:', '').replace('+', '')}"
-                
-                # Send digest - import locally to avoid circular import
-                try:
-                    from twilio.rest import Client
-                    from .settings import TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_WHATSAPP_NUMBER
-                    
-                    client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-                    client.messages.create(
-                        from_=TWILIO_WHATSAPP_NUMBER,
-                        to=user_phone,
-                        body=message
-                    )
-                    success = True
-                except Exception as e:
-                    logger.error(f"Error sending WhatsApp message: {e}")
-                    success = False
-                
-                if success:
-                    logger.info(f"Daily digest sent to {user_phone}")
-                else:
-                    logger.error(f"Failed to send daily digest to {user_phone}")
-                    
+    except Exception as e:
+        logger.error(f"Error sending daily digest to {user_phone}: {e}")
+
+async def send_daily_digest():
+    """Send daily digest to all users with pending reminders."""
+    # UTC, like the stored due_at values and the dashboard's "today"
+    today = datetime.utcnow().date()
+    today_start, today_end = day_bounds(today)
+    
+    try:
+        # All of today's pending reminders in one query
+        reminders = await asyncio.to_thread(_load_digest_reminders, today_start, today_end)
     except Exception as e:
         logger.error(f"Error sending daily digest: {e}")
-    finally:
-        db.close()
+        return
+    
+    # Group reminders by user and send the digests concurrently, at most DIGEST_WORKERS at a time.
+    # The semaphore is made per run so it always belongs to the loop the job runs on.
+    slots = asyncio.Semaphore(DIGEST_WORKERS)
+    await asyncio.gather(*(
+        _send_one_digest(user_phone, list(user_reminders), today, slots)
+        for user_phone, user_reminders in groupby(reminders, key=attrgetter("for_user"))
+    ))
 
 def schedule_reminder(reminder: Reminder):
     """Schedule a specific reminder notification."""
     if not reminder.due_at or not scheduler:
         return
     
+    _schedule_at(reminder.id, reminder.due_at, datetime.utcnow())
+
+def _schedule_at(reminder_id: int, due_at: datetime, now: datetime):
+    """Schedule a notification for a reminder given just its id and due time."""
     # Schedule notification 5 minutes before due time
-    notification_time = reminder.due_at - timedelta(minutes=5)
+    notification_time = due_at - timedelta(minutes=5)
     
     # Only schedule if notification time is in the future
-    if notification_time > datetime.now():
-        job_id = f"reminder_{reminder.id}"
+    if notification_time > now:
+        job_id = f"reminder_{reminder_id}"
         
         try:
             scheduler.add_job(
                 send_reminder_notification,
-                DateTrigger(run_date=notification_time),
-                args=[reminder.id],
+                # due_at is naive UTC, so don't let the trigger read it in the scheduler's TZ
+                DateTrigger(run_date=notification_time, timezone=pytz.UTC),
+                args=[reminder_id],
                 id=job_id,
                 replace_existing=True
             )
-            logger.info(f"Scheduled reminder {reminder.id} for {notification_time}")
+            logger.info(f"Scheduled reminder {reminder_id} for {notification_time}")
         except Exception as e:
-            logger.error(f"Failed to schedule reminder {reminder.id}: {e}")
+            logger.error(f"Failed to schedule reminder {reminder_id}: {e}")
 
 def start_scheduler():
-    """Start the background scheduler."""
+    """
+    Start the scheduler on the running event loop.
+    Must be called from within the app's lifespan so jobs share its loop and HTTP client.
+    """
     global scheduler
     
     if scheduler is not None:
         logger.warning("Scheduler already running")
         return
     
-    scheduler = BackgroundScheduler(timezone=TZ)
+    # Jobs are coroutines awaited on the app's loop; a job that fell behind (e.g. after
+    # a restart) runs once rather than once per missed run time
+    scheduler = AsyncIOScheduler(
+        event_loop=asyncio.get_running_loop(),
+        timezone=TZ,
+        executors={"default": AsyncIOExecutor()},
+        job_defaults={"coalesce": True, "max_instances": 1, "misfire_grace_time": 300}
+    )
     
     # Schedule daily digest
     scheduler.add_job(
@@ -175,18 +207,17 @@ def start_scheduler():
     # Schedule existing pending reminders
     db = SessionLocal()
     try:
-        pending_reminders = db.query(Reminder).filter(
-            and_(
-                Reminder.status == "PENDING",
-                Reminder.due_at.isnot(None),
-                Reminder.due_at > datetime.now()
-            )
-        ).all()
+        # Only the two columns scheduling needs, streamed in batches rather than
+        # hydrating every pending reminder up front
+        now = datetime.utcnow()
+        pending_reminders = db.execute(_UPCOMING_QUERY, {"now": now})
         
-        for reminder in pending_reminders:
-            schedule_reminder(reminder)
+        count = 0
+        for reminder_id, due_at in pending_reminders:
+            _schedule_at(reminder_id, due_at, now)
+            count += 1
             
-        logger.info(f"Scheduled {len(pending_reminders)} existing reminders")
+        logger.info(f"Scheduled {count} existing reminders")
         
     except Exception as e:
         logger.error(f"Error scheduling existing reminders: {e}")
@@ -197,7 +228,7 @@ def start_scheduler():
     logger.info("Scheduler started successfully")
 
 def stop_scheduler():
-    """Stop the background scheduler."""
+    """Stop the scheduler."""
     global scheduler
     
     if scheduler is not None:
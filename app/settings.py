@@ -1,24 +1,37 @@
 """Configuration settings for Nudgly application."""
 
+import logging
 import os
-from typing import Set
+import secrets
+from typing import FrozenSet
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Application settings
 APP_BASE_URL = os.getenv("APP_BASE_URL", "http://localhost:8000")
 TZ = os.getenv("TZ", "UTC")
 DAILY_DIGEST_HOUR = int(os.getenv("DAILY_DIGEST_HOUR", "8"))
 
+# Secret for signing web dashboard session cookies - must be shared by all workers
+SECRET_KEY = os.getenv("SECRET_KEY") or secrets.token_urlsafe(32)
+
 # Database
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./nudgly.db")
 
-# Security - Allowed WhatsApp senders
-ALLOWED_SENDERS: Set[str] = {
-    s.strip() for s in os.getenv("ALLOWED_SENDERS", "").split(",") if s.strip()
-}
+
+def normalize_phone(phone: str) -> str:
+    """Canonical form of a phone number for comparisons: "+447..." with no scheme, spaces or dashes."""
+    return "+" + "".join(filter(str.isdigit, phone.lower().replace("whatsapp:", "")))
+
+
+# Security - Allowed WhatsApp senders, normalized once so checks are a plain lookup
+ALLOWED_SENDERS: FrozenSet[str] = frozenset(
+    normalize_phone(s) for s in os.getenv("ALLOWED_SENDERS", "").split(",") if s.strip()
+)
 
 # Twilio WhatsApp configuration
 TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
@@ -43,7 +56,14 @@ def validate_settings():
         raise ValueError(f"Missing required environment variables: {', '.join(missing_vars)}")
     
     if not ALLOWED_SENDERS:
-        print("Warning: No ALLOWED_SENDERS configured - all numbers will be blocked")
+        logger.warning("No ALLOWED_SENDERS configured - all numbers will be blocked")
+    
+    if not os.getenv("SECRET_KEY"):
+        if os.getenv("VERCEL"):
+            # Each serverless instance would sign sessions with its own random key,
+            # logging users out whenever a request lands on another instance
+            raise ValueError("SECRET_KEY must be set on Vercel")
+        logger.warning("No SECRET_KEY configured - dashboard logins won't survive restarts or span workers")
 
 # Command patterns for natural language processing
 REMINDER_KEYWORDS = [
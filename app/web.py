@@ -2,32 +2,71 @@
 Web interface routes for Nudgly dashboard.
 """
 
-from datetime import datetime, date
+from datetime import datetime
 from typing import Optional
+from itsdangerous import BadSignature, URLSafeTimedSerializer
 from fastapi import APIRouter, Request, Form, HTTPException, Depends, status
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, or_, bindparam, case, func, select
 
-from .db import get_db
+from .db import get_db, day_bounds, get_cached_counts, set_cached_counts, invalidate_counts
 from .models import Reminder
-from .settings import ALLOWED_SENDERS
-from .parsers import parse_text
+from .settings import ALLOWED_SENDERS, SECRET_KEY, normalize_phone
+from .parsers import parse_text, complete_parse
 
 router = APIRouter()
 templates = Jinja2Templates(directory="app/templates")
 
-# Simple session storage (in production, use Redis or database)
-active_sessions = {}
+# Stateless sessions: the logged-in phone lives in a signed, timestamped cookie,
+# so any worker can verify it and nothing is held in process memory
+SESSION_COOKIE = "session"
+SESSION_MAX_AGE = 86400  # 24 hours
+session_serializer = URLSafeTimedSerializer(SECRET_KEY, salt="nudgly-session")
+
+# Dashboard queries, built once with bound parameters so each request only binds values.
+# The task lists select just the columns the template renders.
+_TODAY_TASKS_QUERY = select(Reminder.id, Reminder.text, Reminder.due_at).where(
+    Reminder.for_user == bindparam("user"),
+    Reminder.status == "PENDING",
+    Reminder.due_at.isnot(None),
+    Reminder.due_at >= bindparam("start"),
+    Reminder.due_at < bindparam("end")
+).order_by(Reminder.due_at)
+
+_UPCOMING_TASKS_QUERY = select(Reminder.id, Reminder.text, Reminder.due_at).where(
+    Reminder.for_user == bindparam("user"),
+    Reminder.status == "PENDING",
+    or_(
+        Reminder.due_at.is_(None),
+        Reminder.due_at >= bindparam("end")
+    )
+).order_by(Reminder.due_at.asc()).limit(10)
+
+_COUNTS_QUERY = select(
+    func.coalesce(func.sum(case((Reminder.status == "PENDING", 1), else_=0)), 0).label("pending"),
+    func.coalesce(func.sum(case((
+        and_(
+            Reminder.status == "DONE",
+            Reminder.updated_at >= bindparam("start")
+        ), 1), else_=0)), 0).label("done_today")
+).where(
+    Reminder.for_user == bindparam("user"),
+    Reminder.status.in_(["PENDING", "DONE"])
+)
 
 def get_current_user(request: Request) -> Optional[str]:
     """Get current logged-in user from session."""
-    session_id = request.cookies.get("session_id")
-    if session_id and session_id in active_sessions:
-        return active_sessions[session_id]["phone"]
-    return None
+    token = request.cookies.get(SESSION_COOKIE)
+    if not token:
+        return None
+    try:
+        session = session_serializer.loads(token, max_age=SESSION_MAX_AGE)
+    except BadSignature:  # Also raised for expired sessions
+        return None
+    return session.get("phone")
 
 def require_auth(request: Request) -> str:
     """Require authentication, redirect to login if not authenticated."""
@@ -68,7 +107,7 @@ async def login(
     """Handle login form submission."""
     # Simple authentication - check if phone is in allowed senders
     # In production, use proper password hashing and user management
-    if phone not in ALLOWED_SENDERS:
+    if normalize_phone(phone) not in ALLOWED_SENDERS:
         return templates.TemplateResponse("login.html", {
             "request": request,
             "error": "Phone number not authorized",
@@ -84,20 +123,16 @@ async def login(
             "phone": phone
         })
     
-    # Create session
-    import uuid
-    session_id = str(uuid.uuid4())
-    active_sessions[session_id] = {
-        "phone": phone,
-        "created_at": datetime.utcnow()
-    }
+    # Create session (the signature carries the creation timestamp), storing the number
+    # in the same form Twilio sends it so it matches the reminders' for_user
+    token = session_serializer.dumps({"phone": f"whatsapp:{normalize_phone(phone)}"})
     
     # Set cookie and redirect
     response = RedirectResponse(url="/dashboard", status_code=302)
     response.set_cookie(
-        key="session_id",
-        value=session_id,
-        max_age=86400,  # 24 hours
+        key=SESSION_COOKIE,
+        value=token,
+        max_age=SESSION_MAX_AGE,
         httponly=True,
         secure=False  # Set to True in production with HTTPS
     )
@@ -106,12 +141,8 @@ async def login(
 @router.get("/logout")
 async def logout(request: Request):
     """Logout and clear session."""
-    session_id = request.cookies.get("session_id")
-    if session_id and session_id in active_sessions:
-        del active_sessions[session_id]
-    
     response = RedirectResponse(url="/login", status_code=302)
-    response.delete_cookie("session_id")
+    response.delete_cookie(SESSION_COOKIE)
     return response
 
 @router.get("/dashboard", response_class=HTMLResponse)
@@ -119,48 +150,33 @@ async def dashboard(request: Request, db: Session = Depends(get_db)):
     """Main dashboard page."""
     user_phone = require_auth(request)
     
-    today = date.today()
-    now = datetime.now()
+    # One clock read per request, in UTC like the stored due_at/updated_at values -
+    # a local-time "today" skewed the completed-today count against utcnow() updates
+    today = datetime.utcnow().date()
+    today_start, today_end = day_bounds(today)
     
-    # Get today's tasks
-    today_tasks = db.query(Reminder).filter(
-        and_(
-            Reminder.for_user == user_phone,
-            Reminder.status == "PENDING",
-            Reminder.due_at.isnot(None),
-            Reminder.due_at >= datetime.combine(today, datetime.min.time()),
-            Reminder.due_at < datetime.combine(today, datetime.max.time())
-        )
-    ).order_by(Reminder.due_at).all()
+    # Today's tasks, upcoming tasks (beyond today) and, unless cached, the counts
+    counts = get_cached_counts(user_phone)
+    queries = [
+        (_TODAY_TASKS_QUERY, {"user": user_phone, "start": today_start, "end": today_end}),
+        (_UPCOMING_TASKS_QUERY, {"user": user_phone, "end": today_end}),
+    ]
+    if counts is None:
+        queries.append((_COUNTS_QUERY, {"user": user_phone, "start": today_start}))
     
-    # Get upcoming tasks (beyond today)
-    upcoming_tasks = db.query(Reminder).filter(
-        and_(
-            Reminder.for_user == user_phone,
-            Reminder.status == "PENDING",
-            or_(
-                Reminder.due_at.is_(None),
-                Reminder.due_at >= datetime.combine(today, datetime.max.time())
-            )
-        )
-    ).order_by(Reminder.due_at.asc()).limit(10).all()
+    # Small indexed reads, run one after another on the request's session (one pooled connection)
+    results = [db.execute(stmt, params).all() for stmt, params in queries]
+    
+    today_tasks, upcoming_tasks = results[0], results[1]
     
     # Get counts
     today_count = len(today_tasks)
-    pending_count = db.query(Reminder).filter(
-        and_(
-            Reminder.for_user == user_phone,
-            Reminder.status == "PENDING"
-        )
-    ).count()
-    
-    completed_today_count = db.query(Reminder).filter(
-        and_(
-            Reminder.for_user == user_phone,
-            Reminder.status == "DONE",
-            Reminder.updated_at >= datetime.combine(today, datetime.min.time())
-        )
-    ).count()
+    if counts is None:
+        stats = results[2][0]
+        pending_count, completed_today_count = stats.pending, stats.done_today
+        set_cached_counts(user_phone, (pending_count, completed_today_count))
+    else:
+        pending_count, completed_today_count = counts
     
     return templates.TemplateResponse("dashboard.html", {
         "request": request,
@@ -189,6 +205,8 @@ async def add_task(
     # Parse the reminder using existing parser
     try:
         parsed = parse_text(text)
+        if not parsed.due_at:
+            parsed = await complete_parse(parsed)
         
         reminder = Reminder(
             created_by=user_phone,
@@ -201,6 +219,7 @@ async def add_task(
         
         db.add(reminder)
         db.commit()
+        invalidate_counts(user_phone)
         
         return {"status": "success", "message": "Task added successfully"}
         
@@ -229,6 +248,7 @@ async def mark_task_done(
     task.status = "DONE"
     task.updated_at = datetime.utcnow()
     db.commit()
+    invalidate_counts(user_phone)
     
     return {"status": "success", "message": "Task marked as done"}
 
@@ -254,5 +274,6 @@ async def cancel_task(
     task.status = "CANCELLED"
     task.updated_at = datetime.utcnow()
     db.commit()
+    invalidate_counts(user_phone)
     
     return {"status": "success", "message": "Task cancelled"}
@@ -1,84 +1,95 @@
 """Voice note transcription utilities using OpenAI Whisper."""
 
 import io
-import tempfile
+import logging
 from typing import Optional
-import requests
-from openai import OpenAI
-from twilio.rest import Client
+import httpx
 
 from .settings import OPENAI_API_KEY, TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN
 
+logger = logging.getLogger(__name__)
+
+# Shared client for Twilio media downloads, so concurrent webhooks reuse pooled connections.
+# Media URLs redirect to a signed CDN URL; httpx drops the auth header when it follows them.
+media_http = httpx.AsyncClient(
+    auth=(TWILIO_ACCOUNT_SID or "", TWILIO_AUTH_TOKEN or ""),
+    timeout=30.0,
+    follow_redirects=True,
+    limits=httpx.Limits(max_keepalive_connections=20, max_connections=50)
+)
+
 
 class VoiceTranscriber:
     """Handles voice note downloading and transcription."""
     
     def __init__(self):
-        self.openai_client = OpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY else None
-        self.twilio_client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+        self._openai_client = None
+    
+    @property
+    def openai_client(self):
+        """OpenAI client, created on first use to keep the SDK import off cold starts."""
+        if self._openai_client is None and OPENAI_API_KEY:
+            from openai import AsyncOpenAI
+            self._openai_client = AsyncOpenAI(api_key=OPENAI_API_KEY)
+        return self._openai_client
     
-    def transcribe_voice_note(self, media_url: str, content_type: str) -> Optional[str]:
+    async def transcribe_voice_note(self, media_url: str, content_type: str) -> Optional[str]:
         """Download and transcribe a voice note from Twilio."""
         if not self.openai_client:
-            print("OpenAI API key not configured")
+            logger.warning("OpenAI API key not configured")
             return None
         
         # Check if it's an audio file
         if not content_type.startswith('audio/'):
-            print(f"Not an audio file: {content_type}")
+            logger.info(f"Not an audio file: {content_type}")
             return None
         
         try:
             # Download the audio file
-            audio_data = self._download_media(media_url)
+            audio_data = await self._download_media(media_url)
             if not audio_data:
                 return None
             
             # Transcribe using Whisper
-            return self._transcribe_audio(audio_data, content_type)
+            return await self._transcribe_audio(audio_data, content_type)
             
         except Exception as e:
-            print(f"Error transcribing voice note: {e}")
+            logger.error(f"Error transcribing voice note: {e}")
             return None
     
-    def _download_media(self, media_url: str) -> Optional[bytes]:
+    async def _download_media(self, media_url: str) -> Optional[bytes]:
         """Download media file from Twilio."""
         try:
-            # Twilio media URLs require authentication
-            response = requests.get(
-                media_url,
-                auth=(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN),
-                timeout=30
-            )
+            # Twilio media URLs require authentication (set on the shared client)
+            response = await media_http.get(media_url)
             response.raise_for_status()
             return response.content
         except Exception as e:
-            print(f"Error downloading media: {e}")
+            logger.error(f"Error downloading media: {e}")
             return None
     
-    def _transcribe_audio(self, audio_data: bytes, content_type: str) -> Optional[str]:
+    async def _transcribe_audio(self, audio_data: bytes, content_type: str) -> Optional[str]:
         """Transcribe audio data using OpenAI Whisper."""
         try:
             # Determine file extension from content type
             extension = self._get_file_extension(content_type)
             
-            # Create temporary file for Whisper API
-            with tempfile.NamedTemporaryFile(suffix=extension, delete=False) as temp_file:
-                temp_file.write(audio_data)
-                temp_file.flush()
-                
-                # Transcribe using Whisper
-                with open(temp_file.name, 'rb') as audio_file:
-                    transcript = self.openai_client.audio.transcriptions.create(
-                        model="whisper-1",
-                        file=audio_file,
-                        language="en"  # Can be removed to auto-detect
-                    )
-                
-                return transcript.text.strip()
-                
+            # The SDK takes any named file-like object, so upload straight from memory;
+            # the name tells Whisper the audio format
+            audio_file = io.BytesIO(audio_data)
+            audio_file.name = f"audio{extension}"
+            
+            # Transcribe using Whisper
+            transcript = await self.openai_client.audio.transcriptions.create(
+                model="whisper-1",
+                file=audio_file,
+                language="en"  # Can be removed to auto-detect
+            )
+            
+            return transcript.text.strip()
+            
         except Exception as e:
-            print(f"Error in Whisper transcription: {e}")
+            logger.error(f"Error in Whisper transcription: {e}")
             return None
     
     def _get_file_extension(self, content_type: str) -> str:
@@ -117,7 +128,7 @@ async def transcribe_if_voice(form_data) -> str:
         return body
     
     # Try to transcribe the voice note
-    transcribed_text = transcriber.transcribe_voice_note(media_url, content_type)
+    transcribed_text = await transcriber.transcribe_voice_note(media_url, content_type)
     
     if transcribed_text:
         # If we have both body text and transcription, combine them
@@ -129,7 +140,7 @@ async def transcribe_if_voice(form_data) -> str:
     return body if body.strip() else "Voice note received (transcription failed)"
 
 
-def download_and_transcribe(media_url: str, content_type: str) -> Optional[str]:
+async def download_and_transcribe(media_url: str, content_type: str) -> Optional[str]:
     """Direct function to download and transcribe a voice note."""
-    return transcriber.transcribe_voice_note(media_url, content_type)
+    return await transcriber.transcribe_voice_note(media_url, content_type)
 
@@ -0,0 +1,65 @@
+"""Shared test setup: a throwaway configuration, applied before any app module is imported."""
+
+import os
+import tempfile
+
+import pytest
+
+_test_dir = tempfile.mkdtemp(prefix="nudgly-tests-")
+
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{_test_dir}/nudgly.db",
+    "APP_BASE_URL": "https://nudgly.example.com",
+    "TWILIO_ACCOUNT_SID": "ACtest",
+    "TWILIO_AUTH_TOKEN": "test-token",
+    "TWILIO_WHATSAPP_NUMBER": "whatsapp:+14155238886",
+    "ALLOWED_SENDERS": "whatsapp:+447700900001",
+    "OPENAI_API_KEY": "",
+    "SECRET_KEY": "test-secret",
+})
+
+
+# App modules read their configuration at import, so they're only imported from here on
+from fastapi.testclient import TestClient
+from twilio.request_validator import RequestValidator
+
+from app import handlers
+from app.db import SessionLocal, _counts_cache, init_db
+from app.main import app
+from app.models import Reminder
+
+
+@pytest.fixture
+def db():
+    """A session on a freshly emptied database."""
+    init_db()
+    session = SessionLocal()
+    session.query(Reminder).delete()
+    session.commit()
+    _counts_cache.clear()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def sent_messages(monkeypatch):
+    """Capture outgoing WhatsApp messages instead of calling Twilio."""
+    sent = []
+
+    async def fake_send(to_phone, message):
+        sent.append((to_phone, message))
+        return True
+
+    monkeypatch.setattr(handlers, "send_whatsapp_message", fake_send)
+    return sent
+
+
+@pytest.fixture
+def client(db, sent_messages):
+    return TestClient(app)
+
+
+def twilio_signature(path: str, data: dict) -> dict:
+    """Headers signing a form post to path the way Twilio does, against APP_BASE_URL."""
+    url = f"{os.environ['APP_BASE_URL']}{path}"
+    return {"X-Twilio-Signature": RequestValidator(os.environ["TWILIO_AUTH_TOKEN"]).compute_signature(url, data)}
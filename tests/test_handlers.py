@@ -0,0 +1,132 @@
+"""Tests for the WhatsApp webhook and message handlers."""
+
+from datetime import datetime, timedelta
+
+from twilio.request_validator import RequestValidator
+
+from conftest import twilio_signature
+
+from app import handlers
+from app.db import get_cached_counts, set_cached_counts
+from app.handlers import MessageHandler, NOT_FOUND_TEXT
+from app.models import Reminder, ReminderSource, ReminderStatus
+from app.parsers import parse_text
+
+SENDER = "whatsapp:+447700900001"
+WEBHOOK = "/twilio/whatsapp"
+
+
+def post_message(client, body: str, sender: str = SENDER):
+    data = {"From": sender, "Body": body, "NumMedia": "0"}
+    return client.post(WEBHOOK, data=data, headers=twilio_signature(WEBHOOK, data))
+
+
+def add_reminder(db, text: str, for_user: str = SENDER) -> int:
+    reminder = Reminder(
+        created_by=for_user,
+        for_user=for_user,
+        text=text,
+        due_at=datetime.utcnow() + timedelta(hours=1),
+        status=ReminderStatus.PENDING,
+        source=ReminderSource.TEXT
+    )
+    db.add(reminder)
+    db.commit()
+    return reminder.id
+
+
+def statuses(db) -> dict:
+    db.expire_all()
+    return {reminder.text: reminder.status for reminder in db.query(Reminder)}
+
+
+def test_done_by_id(db):
+    reminder_id = add_reminder(db, "take meds")
+    add_reminder(db, "bins")
+
+    reply = MessageHandler(db).handle_done(parse_text(f"DONE #{reminder_id}"), SENDER)
+
+    assert f"#{reminder_id}" in reply
+    assert statuses(db) == {"take meds": ReminderStatus.DONE, "bins": ReminderStatus.PENDING}
+
+
+def test_done_by_text_completes_exactly_one_match(db):
+    add_reminder(db, "call mum")
+    add_reminder(db, "call the GP")
+    add_reminder(db, "call the bank")
+
+    MessageHandler(db).handle_done(parse_text("done call"), SENDER)
+
+    assert list(statuses(db).values()).count(ReminderStatus.DONE) == 1
+
+
+def test_done_by_id_ignores_other_users_reminders(db):
+    reminder_id = add_reminder(db, "take meds", for_user="whatsapp:+447700900002")
+
+    assert MessageHandler(db).handle_done(parse_text(f"DONE {reminder_id}"), SENDER) == NOT_FOUND_TEXT
+    assert statuses(db) == {"take meds": ReminderStatus.PENDING}
+
+
+def test_second_done_is_not_found(db):
+    reminder_id = add_reminder(db, "take meds")
+    handler = MessageHandler(db)
+
+    handler.handle_done(parse_text(f"DONE {reminder_id}"), SENDER)
+
+    assert handler.handle_done(parse_text(f"DONE {reminder_id}"), SENDER) == NOT_FOUND_TEXT
+    assert handler.handle_done(parse_text("done take meds"), SENDER) == NOT_FOUND_TEXT
+
+
+def test_whatsapp_changes_invalidate_dashboard_counts(db):
+    reminder_id = add_reminder(db, "take meds")
+    handler = MessageHandler(db)
+
+    set_cached_counts(SENDER, (1, 0))
+    handler.handle_done(parse_text(f"DONE {reminder_id}"), SENDER)
+    assert get_cached_counts(SENDER) is None
+
+    set_cached_counts(SENDER, (0, 1))
+    handler.handle_reminder(parse_text("water plants at 6pm"), SENDER, ReminderSource.TEXT)
+    assert get_cached_counts(SENDER) is None
+
+
+def test_reminder_without_a_time_is_saved_before_the_webhook_returns(client, db, sent_messages):
+    response = post_message(client, "todo: email Alex")
+
+    assert response.status_code == 200
+    reminder = db.query(Reminder).one()
+    assert (reminder.for_user, reminder.text, reminder.status) == (SENDER, "email Alex", ReminderStatus.PENDING)
+    assert reminder.due_at is not None
+    assert len(sent_messages) == 1
+    assert "email Alex" in sent_messages[0][1]
+
+
+def test_webhook_accepts_valid_signature(client, sent_messages):
+    assert post_message(client, "list").status_code == 200
+    assert len(sent_messages) == 1
+
+
+def test_webhook_rejects_invalid_signature(client, sent_messages):
+    data = {"From": SENDER, "Body": "list", "NumMedia": "0"}
+    response = client.post(WEBHOOK, data=data, headers={"X-Twilio-Signature": "forged"})
+
+    assert response.status_code == 403
+    assert sent_messages == []
+
+
+def test_webhook_signature_is_checked_against_app_base_url(client, sent_messages):
+    # The test client talks to http://testserver, but Twilio signs the public URL
+    data = {"From": SENDER, "Body": "list", "NumMedia": "0"}
+    signed_for_local_url = {"X-Twilio-Signature": RequestValidator("test-token").compute_signature(
+        f"http://testserver{WEBHOOK}", data
+    )}
+
+    assert client.post(WEBHOOK, data=data, headers=signed_for_local_url).status_code == 403
+    assert client.post(WEBHOOK, data=data, headers=twilio_signature(WEBHOOK, data)).status_code == 200
+
+
+def test_webhook_rejected_without_auth_token(client, monkeypatch, sent_messages):
+    monkeypatch.setattr(handlers, "twilio_validator", None)
+
+    assert post_message(client, "list").status_code == 403
+    assert sent_messages == []
@@ -0,0 +1,60 @@
+"""Tests for reminder text parsing."""
+
+from datetime import datetime
+
+import pytest
+import pytz
+
+from app.parsers import MessageParser, parse_text
+
+# Thursday 15 October 2026, 10:00 UTC
+NOW = pytz.UTC.localize(datetime(2026, 10, 15, 10, 0))
+
+
+def utc(*args) -> datetime:
+    return pytz.UTC.localize(datetime(*args))
+
+
+@pytest.mark.parametrize("text, due_at, task", [
+    # Phrases the original time patterns handled
+    ("take meds at 11am", utc(2026, 10, 15, 11, 0), "take meds"),
+    ("take meds at 9am", utc(2026, 10, 16, 9, 0), "take meds"),  # Already past today
+    ("gym at 18:30", utc(2026, 10, 15, 18, 30), "gym"),
+    ("call GP tomorrow at 11", utc(2026, 10, 16, 11, 0), "call GP"),
+    ("call GP tomorrow", utc(2026, 10, 16, 10, 0), "call GP"),
+    ("call mum in 5 minutes", utc(2026, 10, 15, 10, 5), "call mum"),
+    ("check the oven in 2 hours", utc(2026, 10, 15, 12, 0), "check the oven"),
+    ("call the GP in 2 days", utc(2026, 10, 17, 10, 0), "call the GP"),
+    ("dentist on 12/11 at 3pm", utc(2026, 12, 11, 15, 0), "dentist"),
+    # Phrases the dateparser search got wrong or missed
+    ("take the bins out tonight", utc(2026, 10, 15, 20, 0), "take the bins out"),
+    ("take the bins out tonight at 9", utc(2026, 10, 15, 21, 0), "take the bins out"),
+    ("pay rent on the 1st", utc(2026, 11, 1, 9, 0), "pay rent"),
+    ("pay rent on the 31st", utc(2026, 10, 31, 9, 0), "pay rent"),
+    ("call may at noon", utc(2026, 10, 15, 12, 0), "call may"),
+    ("call mum in an hour", utc(2026, 10, 15, 11, 0), "call mum"),
+    ("meeting on friday at 2pm", utc(2026, 10, 16, 14, 0), "meeting"),
+    ("meeting next thursday", utc(2026, 10, 22, 9, 0), "meeting"),
+    ("dentist on 3 December at 3pm", utc(2026, 12, 3, 15, 0), "dentist"),
+    ("send card march 3rd", utc(2027, 3, 3, 9, 0), "send card"),
+    ("lock up at midnight", utc(2026, 10, 16, 0, 0), "lock up"),
+])
+def test_extract_datetime(text, due_at, task):
+    assert MessageParser()._extract_datetime(text, now=NOW) == (due_at, task)
+
+
+@pytest.mark.parametrize("text", ["email Alex", "buy milk", "finish today's report", "book 13pm slot"])
+def test_extract_datetime_without_a_time(text):
+    assert MessageParser()._extract_datetime(text, now=NOW) == (None, text)
+
+
+@pytest.mark.parametrize("message, command_type, task", [
+    ("Remind me to take meds at 9am", "reminder", "take meds"),
+    ("todo: email Alex", "reminder", "email Alex"),
+    ("LIST", "list", "LIST"),
+    ("DONE 12", "done", "DONE 12"),
+    ("cancel #2", "cancel", "cancel #2"),
+])
+def test_parse_text(message, command_type, task):
+    parsed = parse_text(message)
+    assert (parsed.command_type, parsed.text) == (command_type, task)
@@ -0,0 +1,41 @@
+"""Tests for the daily digest fan-out in the scheduler."""
+
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+from app import scheduler
+
+
+def test_daily_digest_limits_concurrent_sends(monkeypatch):
+    """No more than DIGEST_WORKERS digest sends are ever in flight at once."""
+    users = scheduler.DIGEST_WORKERS * 3
+    due_at = datetime.utcnow()
+    reminders = [
+        SimpleNamespace(for_user=f"whatsapp:+44{n:04d}", text="take meds", due_at=due_at)
+        for n in range(users)
+    ]
+    monkeypatch.setattr(scheduler, "_load_digest_reminders", lambda start, end: reminders)
+
+    in_flight = 0
+    peak = 0
+    sent = []
+
+    async def fake_send(to_phone, message):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        sent.append(to_phone)
+        return True
+
+    monkeypatch.setattr(scheduler, "send_whatsapp_message", fake_send)
+
+    # Separate event loops, as with a restarted app - the limit mustn't be tied to the first
+    for _ in range(2):
+        peak = 0
+        asyncio.run(scheduler.send_daily_digest())
+        assert peak == scheduler.DIGEST_WORKERS
+
+    assert len(sent) == users * 2
@@ -0,0 +1,39 @@
+"""Tests for configuration handling."""
+
+import logging
+
+import pytest
+
+from app import settings
+
+
+@pytest.mark.parametrize("phone", [
+    "+447700900001",
+    "+44 7700 900001",
+    "+44-7700-900-001",
+    "whatsapp:+447700900001",
+    "WhatsApp:+44 7700 900001",
+    " 447700900001 ",
+])
+def test_normalize_phone(phone):
+    assert settings.normalize_phone(phone) == "+447700900001"
+
+
+def test_validate_settings_logs_configuration_warnings(monkeypatch, caplog):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(settings, "ALLOWED_SENDERS", frozenset())
+    monkeypatch.delenv("SECRET_KEY")
+
+    with caplog.at_level(logging.WARNING, logger="app.settings"):
+        settings.validate_settings()
+
+    assert [record.levelno for record in caplog.records] == [logging.WARNING, logging.WARNING]
+
+
+def test_validate_settings_requires_secret_key_on_vercel(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setenv("VERCEL", "1")
+    monkeypatch.delenv("SECRET_KEY")
+
+    with pytest.raises(ValueError, match="SECRET_KEY"):
+        settings.validate_settings()
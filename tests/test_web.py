@@ -0,0 +1,25 @@
+"""Tests for the web dashboard."""
+
+import pytest
+
+from conftest import twilio_signature
+
+SENDER = "whatsapp:+447700900001"
+WEBHOOK = "/twilio/whatsapp"
+
+
+@pytest.mark.parametrize("login_phone", ["+44 7700 900001", "whatsapp:+447700900001", "+44-7700-900001"])
+def test_dashboard_shows_whatsapp_reminders_for_any_form_of_the_number(client, login_phone):
+    data = {"From": SENDER, "Body": "water plants in 2 hours", "NumMedia": "0"}
+    assert client.post(WEBHOOK, data=data, headers=twilio_signature(WEBHOOK, data)).status_code == 200
+
+    response = client.post("/login", data={"phone": login_phone, "password": "x"}, follow_redirects=False)
+    assert response.status_code == 302
+
+    assert "water plants" in client.get("/dashboard").text
+
+
+def test_login_rejects_unknown_number(client):
+    response = client.post("/login", data={"phone": "+44 7700 900999", "password": "x"})
+
+    assert "Phone number not authorized" in response.text